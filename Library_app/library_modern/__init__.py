@@ -2,7 +2,13 @@
 Library Collection - A modern tkinter-based book management application.
 """
 
-from .ui import LibraryApp
-
 __version__ = "1.0.0"
 __all__ = ["LibraryApp"]
+
+
+def __getattr__(name):
+    # Imported on first use so the headless server does not need the GUI stack
+    if name == "LibraryApp":
+        from .ui import LibraryApp
+        return LibraryApp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
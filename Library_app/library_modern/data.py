@@ -3,6 +3,8 @@ Data management for the library application.
 Handles loading, saving, and manipulating book data and application settings.
 """
 
+import csv
+import io
 import json
 import os
 from pathlib import Path
@@ -10,6 +12,13 @@ from pathlib import Path
 
 DB_FILE = "library_db.json"
 SETTINGS_FILE = "settings.json"
+CSV_FIELDS = ["title", "author", "year", "genre", "tags", "cover"]
+
+
+def book_key(book):
+    """Return the (title, author, year, genre) tuple identifying a book."""
+    return (book.get("title", ""), book.get("author", ""),
+            book.get("year", ""), book.get("genre", ""))
 
 
 def load_books():
@@ -45,7 +54,7 @@ def save_settings(settings):
         json.dump(settings, f, indent=2)
 
 
-def add_book(books, title, author, year, genre, tags, cover_path=None):
+def add_book(books, title, author, year, genre, tags, cover_path=None, save=True):
     """
     Add a new book to the collection.
     
@@ -57,6 +66,7 @@ def add_book(books, title, author, year, genre, tags, cover_path=None):
         genre: Book genre
         tags: List of tag strings
         cover_path: Optional path to cover image file
+        save: Persist the collection immediately after adding
     
     Returns:
         The new book dictionary or None if validation fails
@@ -74,7 +84,8 @@ def add_book(books, title, author, year, genre, tags, cover_path=None):
     }
     
     books.append(book)
-    save_books(books)
+    if save:
+        save_books(books)
     return book
 
 
@@ -205,3 +216,31 @@ def copy_cover_file(source_path, dest_dir="covers"):
         return str(dest.as_posix())
     except Exception:
         return None
+
+
+def iter_csv_lines(books):
+    """
+    Yield the collection as CSV text, one line at a time.
+    
+    Args:
+        books: Iterable of book dictionaries
+    
+    Yields:
+        The header line followed by one line per book
+    """
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    yield buf.getvalue()
+    for b in books:
+        buf.seek(0)
+        buf.truncate(0)
+        writer.writerow({
+            "title": b.get("title", ""),
+            "author": b.get("author", ""),
+            "year": b.get("year", ""),
+            "genre": b.get("genre", ""),
+            "tags": ",".join(b.get("tags", [])),
+            "cover": b.get("cover", "")
+        })
+        yield buf.getvalue()
@@ -0,0 +1,526 @@
+"""
+Local HTTP/JSON service for the library application.
+Keeps one shared in-memory collection so that many lightweight clients can
+query a single warm process instead of each loading the database file.
+
+Run with:
+    python -m Library_app.library_modern.server --port 8765
+"""
+
+import argparse
+import asyncio
+import json
+import os
+from urllib.parse import parse_qs, urlsplit
+
+from .data import (
+    DB_FILE, load_books, save_books, add_book, delete_books, book_key,
+    search_books, sort_books, filter_by_tag, add_tag_to_books,
+    remove_tag_from_books, iter_csv_lines
+)
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+STREAM_CHUNK_ROWS = 200
+SAVE_DELAY = 0.05
+MAX_BODY_SIZE = 1024 * 1024
+
+STATUS_TEXT = {
+    200: "OK",
+    201: "Created",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class RequestError(Exception):
+    """An error that is reported to the client as a JSON response."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class LibraryStore:
+    """
+    Shared in-memory book collection with lookup indexes.
+
+    Reads run directly on the event loop. Writes are queued and applied by a
+    single writer task, which also saves the collection once per batch of
+    writes instead of once per request. If the save fails, the whole batch is
+    rolled back and every write in it is reported as failed.
+
+    The store must be the only writer of the database file while it runs.
+    Saving is refused if the file was changed by another program since it
+    was loaded or last saved.
+    """
+
+    def __init__(self, books=None, save_delay=SAVE_DELAY):
+        self.books = load_books() if books is None else books
+        self.save_delay = save_delay
+        self._by_key, self._tag_counts = self._build_indexes(self.books)
+        self._db_mtime = _file_mtime(DB_FILE)
+        self._queue = None
+        self._writer_task = None
+
+    @staticmethod
+    def _build_indexes(books):
+        """Build the key index and per-tag book counts for a book list."""
+        by_key = {}
+        tag_counts = {}
+        for b in books:
+            by_key.setdefault(book_key(b), []).append(b)
+            _count_tags(tag_counts, b, 1)
+        return by_key, tag_counts
+
+    # Reads
+
+    def query(self, keyword=None, tag=None, sort=None):
+        """
+        Return the books matching the given filters, in collection order
+        unless a sort is given.
+
+        Args:
+            keyword: Optional search string matched against title and author
+            tag: Optional tag to filter by ("All" disables the filter)
+            sort: Optional sort choice as accepted by sort_books()
+
+        Returns:
+            List of book dictionaries
+        """
+        books = self.books
+        if tag and tag != "All":
+            if tag not in self._tag_counts:
+                return []
+            books = filter_by_tag(books, tag)
+        if keyword:
+            books = search_books(books, keyword)
+        if sort:
+            books = sort_books(books, sort)
+        return books
+
+    def get_tags(self):
+        """Return all tags currently in use, sorted."""
+        return sorted(self._tag_counts)
+
+    # Writes
+
+    async def start(self):
+        """Start the writer task."""
+        self._queue = asyncio.Queue()
+        self._writer_task = asyncio.ensure_future(self._writer())
+
+    async def stop(self):
+        """Apply any queued writes, then stop the writer task."""
+        if self._writer_task is None:
+            return
+        self._queue.put_nowait(None)
+        await self._writer_task
+        self._writer_task = None
+
+    async def submit(self, op, *args):
+        """Queue a write operation and wait until it has been saved."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((op, args, future))
+        return await future
+
+    async def _writer(self):
+        """Apply queued writes in order and save once per batch."""
+        loop = asyncio.get_running_loop()
+        running = True
+        while running:
+            item = await self._queue.get()
+            if item is None:
+                break
+            if self.save_delay:
+                await asyncio.sleep(self.save_delay)
+            batch = [item]
+            while not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    running = False
+                    break
+                batch.append(item)
+
+            # apply_add appends in place, so keep copies to roll back to
+            saved = (list(self.books), dict(self._by_key), dict(self._tag_counts))
+            dirty = False
+            results = []
+            for op, args, future in batch:
+                try:
+                    result, changed = op(*args)
+                except Exception as e:
+                    results.append((future, None, e))
+                    continue
+                dirty = dirty or changed
+                results.append((future, result, None))
+
+            save_error = None
+            if dirty:
+                try:
+                    await loop.run_in_executor(None, self._save, self.books)
+                except Exception as e:
+                    save_error = e
+                    self.books, self._by_key, self._tag_counts = saved
+
+            for future, result, error in results:
+                if future.cancelled():
+                    continue
+                error = error or save_error
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+    def _save(self, books):
+        """Save books unless the database file was changed by someone else."""
+        if _file_mtime(DB_FILE) != self._db_mtime:
+            raise RequestError(409, f"{DB_FILE} was changed by another program; "
+                                    "restart the server to reload it")
+        save_books(books)
+        self._db_mtime = _file_mtime(DB_FILE)
+
+    # Each apply_* method does everything that can fail before it touches
+    # the store, so a failed write leaves books and indexes unchanged.
+
+    def apply_add(self, fields):
+        """Add a book from validated fields. Returns (book or None, changed)."""
+        book = add_book([], fields["title"], fields["author"], fields["year"],
+                        fields["genre"], fields["tags"], fields["cover"], save=False)
+        if book is None:
+            return None, False
+        key = book_key(book)
+        self.books.append(book)
+        self._by_key[key] = self._by_key.get(key, []) + [book]
+        _count_tags(self._tag_counts, book, 1)
+        return book, True
+
+    def apply_delete(self, keys):
+        """Delete books by key. Returns (number deleted, changed)."""
+        books = delete_books(self.books, keys)
+        deleted = len(self.books) - len(books)
+        if not deleted:
+            return 0, False
+        by_key, tag_counts = self._build_indexes(books)
+        self.books, self._by_key, self._tag_counts = books, by_key, tag_counts
+        return deleted, True
+
+    def apply_add_tag(self, keys, tag):
+        """Add a tag to books by key. Returns (number changed, changed)."""
+        return self._apply_tag_change(add_tag_to_books, keys, tag)
+
+    def apply_remove_tag(self, keys, tag):
+        """Remove a tag from books by key. Returns (number changed, changed)."""
+        return self._apply_tag_change(remove_tag_from_books, keys, tag)
+
+    def _apply_tag_change(self, change, keys, tag):
+        """
+        Run a data.py tag function on copies of the books matching the keys,
+        then swap the edited copies into the collection.
+        """
+        matched = [b for k in keys for b in self._by_key.get(k, [])]
+        copies = [dict(b, tags=list(b.get("tags", []))) for b in matched]
+        changed = change(copies, keys, tag)
+        if not changed:
+            return 0, False
+
+        replaced = {id(old): new for old, new in zip(matched, copies)}
+        books = [replaced.get(id(b), b) for b in self.books]
+        tag_counts = dict(self._tag_counts)
+        for old, new in zip(matched, copies):
+            _count_tags(tag_counts, old, -1)
+            _count_tags(tag_counts, new, 1)
+        by_key = dict(self._by_key)
+        for k in keys:
+            if k in by_key:
+                by_key[k] = [replaced.get(id(b), b) for b in by_key[k]]
+
+        self.books, self._by_key, self._tag_counts = books, by_key, tag_counts
+        return changed, True
+
+
+def _file_mtime(path):
+    """Return the file's modification time in nanoseconds, or None if missing."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _count_tags(tag_counts, book, delta):
+    """Adjust per-tag book counts by delta for the tags on one book."""
+    for t in set(book.get("tags", [])):
+        count = tag_counts.get(t, 0) + delta
+        if count > 0:
+            tag_counts[t] = count
+        else:
+            tag_counts.pop(t, None)
+
+
+class LibraryServer:
+    """HTTP/JSON front end for a LibraryStore."""
+
+    ROUTES = {
+        ("GET", "/books"): "get_books",
+        ("GET", "/books/stream"): "stream_books",
+        ("GET", "/tags"): "get_tags",
+        ("GET", "/export.csv"): "export_csv",
+        ("POST", "/books"): "post_book",
+        ("POST", "/books/delete"): "post_delete",
+        ("POST", "/tags/add"): "post_add_tag",
+        ("POST", "/tags/remove"): "post_remove_tag",
+    }
+
+    def __init__(self, store):
+        self.store = store
+        self._headers_sent = set()
+
+    async def handle(self, reader, writer):
+        """Handle a single HTTP request on a client connection."""
+        try:
+            try:
+                method, path, params, body = await self._read_request(reader)
+                if method is None:
+                    return
+                handler = self.ROUTES.get((method, path))
+                if handler is None:
+                    if any(p == path for _, p in self.ROUTES):
+                        raise RequestError(405, f"{method} not allowed on {path}")
+                    raise RequestError(404, f"No such endpoint: {path}")
+                await getattr(self, handler)(params, body, writer)
+            except RequestError as e:
+                await self._send_error(writer, e.status, e.message)
+            except Exception as e:
+                await self._send_error(writer, 500, str(e))
+        except ConnectionError:
+            pass
+        finally:
+            self._headers_sent.discard(writer)
+            writer.close()
+
+    async def _read_request(self, reader):
+        """Parse the request line, headers and body."""
+        line = await reader.readline()
+        if not line:
+            return None, None, None, None
+        try:
+            method, target, _ = line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise RequestError(400, "Malformed request line")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise RequestError(400, "Invalid Content-Length")
+        if length < 0:
+            raise RequestError(400, "Invalid Content-Length")
+        if length > MAX_BODY_SIZE:
+            raise RequestError(413, f"Request body is larger than {MAX_BODY_SIZE} bytes")
+        body = await reader.readexactly(length) if length else b""
+
+        url = urlsplit(target)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        return method.upper(), url.path, params, body
+
+    # Responses
+
+    def _send_head(self, writer, status, content_type, headers):
+        self._headers_sent.add(writer)
+        lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+                 f"Content-Type: {content_type}",
+                 "Connection: close"]
+        lines.extend(f"{k}: {v}" for k, v in headers.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+    async def _send_json(self, writer, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self._send_head(writer, status, "application/json; charset=utf-8",
+                        {"Content-Length": len(body)})
+        writer.write(body)
+        await writer.drain()
+
+    async def _send_error(self, writer, status, message):
+        """Report an error, unless a response is already under way."""
+        # Once headers are out the status can't change; closing the
+        # connection without the final chunk tells the client it failed.
+        if writer in self._headers_sent:
+            return
+        await self._send_json(writer, status, {"error": message})
+
+    async def _send_stream(self, writer, content_type, lines):
+        """Send lines using chunked transfer encoding, a few rows at a time."""
+        self._send_head(writer, 200, content_type,
+                        {"Transfer-Encoding": "chunked"})
+        chunk = []
+        for line in lines:
+            chunk.append(line)
+            if len(chunk) >= STREAM_CHUNK_ROWS:
+                await self._write_chunk(writer, chunk)
+                chunk = []
+        if chunk:
+            await self._write_chunk(writer, chunk)
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _write_chunk(self, writer, lines):
+        data = "".join(lines).encode("utf-8")
+        writer.write(b"%X\r\n%s\r\n" % (len(data), data))
+        await writer.drain()
+
+    # Request parsing helpers
+
+    def _query(self, params):
+        return self.store.query(params.get("q"), params.get("tag"), params.get("sort"))
+
+    def _int_param(self, params, name, default, maximum=None):
+        try:
+            value = int(params.get(name, default))
+        except ValueError:
+            raise RequestError(400, f"'{name}' must be an integer")
+        if value < 0:
+            raise RequestError(400, f"'{name}' must not be negative")
+        return min(value, maximum) if maximum is not None else value
+
+    def _json_body(self, body):
+        try:
+            data = json.loads(body.decode("utf-8") or "{}")
+        except ValueError:
+            raise RequestError(400, "Request body must be valid JSON")
+        if not isinstance(data, dict):
+            raise RequestError(400, "Request body must be a JSON object")
+        return data
+
+    def _keys(self, data):
+        keys = data.get("keys")
+        if not isinstance(keys, list) or not all(
+                isinstance(k, list) and len(k) == 4
+                and all(isinstance(v, str) for v in k) for k in keys):
+            raise RequestError(400, "'keys' must be a list of [title, author, year, genre] strings")
+        return {tuple(k) for k in keys}
+
+    def _tag(self, data):
+        tag = data.get("tag")
+        if not isinstance(tag, str) or not tag.strip():
+            raise RequestError(400, "'tag' must be a non-empty string")
+        return tag.strip()
+
+    def _book_fields(self, data):
+        """Validate a new book's fields, converting tags to a list."""
+        fields = {}
+        for name in ("title", "author", "year", "genre"):
+            value = data.get(name, "")
+            if not isinstance(value, str):
+                raise RequestError(400, f"'{name}' must be a string")
+            fields[name] = value.strip()
+        if not fields["title"] or not fields["author"] or not fields["year"]:
+            raise RequestError(400, "Title, Author, and Year are required.")
+
+        tags = data.get("tags", [])
+        if isinstance(tags, str):
+            tags = tags.split(",")
+        if not isinstance(tags, list) or not all(isinstance(t, str) for t in tags):
+            raise RequestError(400, "'tags' must be a list of strings or a comma-separated string")
+        fields["tags"] = [t.strip() for t in tags if t.strip()]
+
+        cover = data.get("cover")
+        if cover is not None and not isinstance(cover, str):
+            raise RequestError(400, "'cover' must be a string or null")
+        fields["cover"] = cover
+        return fields
+
+    # Endpoints
+
+    async def get_books(self, params, body, writer):
+        """Return one page of matching books."""
+        books = self._query(params)
+        offset = self._int_param(params, "offset", 0)
+        limit = self._int_param(params, "limit", PAGE_SIZE, MAX_PAGE_SIZE)
+        await self._send_json(writer, 200, {
+            "total": len(books),
+            "offset": offset,
+            "limit": limit,
+            "items": books[offset:offset + limit],
+        })
+
+    async def stream_books(self, params, body, writer):
+        """Stream all matching books as newline-delimited JSON."""
+        books = self._query(params)
+        await self._send_stream(writer, "application/x-ndjson; charset=utf-8",
+                                (json.dumps(b) + "\n" for b in books))
+
+    async def get_tags(self, params, body, writer):
+        await self._send_json(writer, 200, {"tags": self.store.get_tags()})
+
+    async def export_csv(self, params, body, writer):
+        """Stream all matching books as CSV."""
+        books = self._query(params)
+        await self._send_stream(writer, "text/csv; charset=utf-8", iter_csv_lines(books))
+
+    async def post_book(self, params, body, writer):
+        fields = self._book_fields(self._json_body(body))
+        book = await self.store.submit(self.store.apply_add, fields)
+        if book is None:
+            raise RequestError(400, "Title, Author, and Year are required.")
+        await self._send_json(writer, 201, {"book": book})
+
+    async def post_delete(self, params, body, writer):
+        keys = self._keys(self._json_body(body))
+        deleted = await self.store.submit(self.store.apply_delete, keys)
+        await self._send_json(writer, 200, {"deleted": deleted})
+
+    async def post_add_tag(self, params, body, writer):
+        data = self._json_body(body)
+        keys, tag = self._keys(data), self._tag(data)
+        changed = await self.store.submit(self.store.apply_add_tag, keys, tag)
+        await self._send_json(writer, 200, {"changed": changed})
+
+    async def post_remove_tag(self, params, body, writer):
+        data = self._json_body(body)
+        keys, tag = self._keys(data), self._tag(data)
+        changed = await self.store.submit(self.store.apply_remove_tag, keys, tag)
+        await self._send_json(writer, 200, {"changed": changed})
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Load the collection and serve it until cancelled."""
+    store = LibraryStore()
+    await store.start()
+    app = LibraryServer(store)
+    server = await asyncio.start_server(app.handle, host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await store.stop()
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Serve the library collection over HTTP/JSON.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,6 @@ UI components for the library application.
 Implements the main LibraryApp class using customtkinter.
 """
 
-import csv
 from pathlib import Path
 from tkinter import ttk, messagebox, filedialog, simpledialog
 
@@ -18,8 +17,9 @@ except ImportError:
 from .data import (
     load_books, save_books, load_settings, save_settings,
     search_books, sort_books, filter_by_tag, get_all_tags,
-    add_tag_to_books, remove_tag_from_books, copy_cover_file
+    copy_cover_file, iter_csv_lines
 )
+from .versioning import VersionedCollection
 
 
 class LibraryApp(ctk.CTk):
@@ -35,7 +35,7 @@ class LibraryApp(ctk.CTk):
         self.geometry(self.WINDOW_GEOMETRY)
         
         # Load data
-        self.books = load_books()
+        self.collection = VersionedCollection(load_books())
         self._settings = load_settings()
         self.current_cover_path = None
         self._image_refs = {}
@@ -47,6 +47,11 @@ class LibraryApp(ctk.CTk):
         self._build_ui()
         self.load_table()
     
+    @property
+    def books(self):
+        """Books in the current version of the collection."""
+        return self.collection.books()
+    
     def _build_ui(self):
         """Build the user interface."""
         self._build_left_panel()
@@ -56,6 +61,7 @@ class LibraryApp(ctk.CTk):
         self._build_main_area()
         self._build_delete_button()
         self._build_bulk_actions()
+        self._build_history_controls()
     
     def _build_left_panel(self):
         """Build the left input panel."""
@@ -196,6 +202,23 @@ class LibraryApp(ctk.CTk):
         ctk.CTkButton(bulk_frame, text="Add Tag to Selected", width=180, command=self.bulk_add_tag).pack(side="left", padx=4)
         ctk.CTkButton(bulk_frame, text="Remove Tag from Selected", width=200, command=self.bulk_remove_tag).pack(side="left", padx=4)
     
+    def _build_history_controls(self):
+        """Build undo/redo and snapshot buttons."""
+        history_frame = ctk.CTkFrame(self)
+        history_frame.pack(fill="x", padx=10, pady=5)
+        
+        self.undo_button = ctk.CTkButton(history_frame, text="Undo", width=90, command=self.undo)
+        self.undo_button.pack(side="left", padx=4)
+        self.redo_button = ctk.CTkButton(history_frame, text="Redo", width=90, command=self.redo)
+        self.redo_button.pack(side="left", padx=4)
+        ctk.CTkButton(history_frame, text="Save Snapshot", width=140, command=self.save_snapshot).pack(side="left", padx=4)
+        ctk.CTkButton(history_frame, text="Restore Snapshot", width=140, command=self.restore_snapshot).pack(side="left", padx=4)
+        ctk.CTkButton(history_frame, text="Compare Snapshot", width=140, command=self.compare_snapshot).pack(side="left", padx=4)
+        
+        self.history_status = ctk.CTkLabel(history_frame, text="", anchor="w")
+        self.history_status.pack(side="left", fill="x", expand=True, padx=8)
+        self.update_history_controls()
+    
     def add_book(self):
         """Add a new book to the collection."""
         title = self.title_var.get().strip()
@@ -222,9 +245,10 @@ class LibraryApp(ctk.CTk):
             "cover": cover_path
         }
         
-        self.books.append(book)
+        self.collection.add(book)
         save_books(self.books)
         self.load_table()
+        self.update_history_controls()
         
         # Clear inputs
         self.title_var.delete(0, "end")
@@ -313,17 +337,7 @@ class LibraryApp(ctk.CTk):
         
         try:
             with open(path, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=["title", "author", "year", "genre", "tags", "cover"])
-                writer.writeheader()
-                for r in rows:
-                    writer.writerow({
-                        "title": r.get("title", ""),
-                        "author": r.get("author", ""),
-                        "year": r.get("year", ""),
-                        "genre": r.get("genre", ""),
-                        "tags": ",".join(r.get("tags", [])),
-                        "cover": r.get("cover", "")
-                    })
+                f.writelines(iter_csv_lines(rows))
             messagebox.showinfo("Exported", f"Exported {len(rows)} book(s) to {path}")
         except Exception as e:
             messagebox.showerror("Export Failed", str(e))
@@ -341,12 +355,13 @@ class LibraryApp(ctk.CTk):
         
         tag = tag.strip()
         book_keys = {tuple(self.table.item(i, "values")) for i in sel}
-        changed = add_tag_to_books(self.books, book_keys, tag)
+        changed = self.collection.add_tag(book_keys, tag)
         
         if changed:
             save_books(self.books)
             self.update_tag_filter_values()
             self.load_table()
+            self.update_history_controls()
         
         messagebox.showinfo("Tag Added", f"Added tag '{tag}' to {changed} book(s)")
     
@@ -363,12 +378,13 @@ class LibraryApp(ctk.CTk):
         
         tag = tag.strip()
         book_keys = {tuple(self.table.item(i, "values")) for i in sel}
-        changed = remove_tag_from_books(self.books, book_keys, tag)
+        changed = self.collection.remove_tag(book_keys, tag)
         
         if changed:
             save_books(self.books)
             self.update_tag_filter_values()
             self.load_table()
+            self.update_history_controls()
         
         messagebox.showinfo("Tag Removed", f"Removed tag '{tag}' from {changed} book(s)")
     
@@ -445,10 +461,91 @@ class LibraryApp(ctk.CTk):
             return
         
         to_remove = {tuple(self.table.item(i, "values")) for i in selected}
-        self.books = [b for b in self.books
-                      if (b.get("title", ""), b.get("author", ""),
-                          b.get("year", ""), b.get("genre", "")) not in to_remove]
+        self.collection.delete(to_remove)
         
         save_books(self.books)
         self.load_table()
         self.update_tag_filter_values()
+        self.update_history_controls()
+    
+    def update_history_controls(self, message=None):
+        """Enable undo/redo only when possible and show what they will do."""
+        self.undo_button.configure(state="normal" if self.collection.can_undo() else "disabled")
+        self.redo_button.configure(state="normal" if self.collection.can_redo() else "disabled")
+        
+        parts = [message] if message else []
+        undo_label = self.collection.undo_label()
+        redo_label = self.collection.redo_label()
+        parts.append(f"Undo: {undo_label}" if undo_label else "Nothing to undo")
+        if redo_label:
+            parts.append(f"Redo: {redo_label}")
+        self.history_status.configure(text="  |  ".join(parts))
+    
+    def _refresh_after_history_change(self, message):
+        """Persist and redisplay the collection after undo/redo/restore."""
+        save_books(self.books)
+        self.load_table()
+        self.update_tag_filter_values()
+        self.update_history_controls(message)
+    
+    def undo(self):
+        """Undo the last change to the collection."""
+        label = self.collection.undo()
+        if label is not None:
+            self._refresh_after_history_change(f"Undid: {label}")
+    
+    def redo(self):
+        """Redo the last undone change."""
+        label = self.collection.redo()
+        if label is not None:
+            self._refresh_after_history_change(f"Redid: {label}")
+    
+    def save_snapshot(self):
+        """Save the current collection under a name."""
+        name = simpledialog.askstring("Save Snapshot", "Snapshot name:")
+        if not name or not name.strip():
+            return
+        self.collection.snapshot(name.strip())
+        messagebox.showinfo("Snapshot Saved", f"Saved snapshot '{name.strip()}'")
+    
+    def _ask_snapshot_name(self, title):
+        """Prompt for an existing snapshot name, or return None."""
+        names = self.collection.snapshot_names()
+        if not names:
+            messagebox.showwarning("No Snapshots", "Save a snapshot first.")
+            return None
+        name = simpledialog.askstring(title, "Snapshot name:\n" + ", ".join(names))
+        if not name:
+            return None
+        name = name.strip()
+        if name not in names:
+            messagebox.showwarning("Unknown Snapshot", f"No snapshot named '{name}'.")
+            return None
+        return name
+    
+    def restore_snapshot(self):
+        """Restore a named snapshot (can be undone)."""
+        name = self._ask_snapshot_name("Restore Snapshot")
+        if not name:
+            return
+        self.collection.restore(name)
+        self._refresh_after_history_change(f"Restored snapshot '{name}'")
+    
+    def compare_snapshot(self):
+        """Show how the current collection differs from a snapshot."""
+        name = self._ask_snapshot_name("Compare Snapshot")
+        if not name:
+            return
+        diff = self.collection.diff(name)
+        lines = [
+            f"Added: {len(diff['added'])}",
+            f"Removed: {len(diff['removed'])}",
+            f"Changed: {len(diff['changed'])}",
+        ]
+        for b in diff["added"][:5]:
+            lines.append(f"+ {b.get('title', '')}")
+        for b in diff["removed"][:5]:
+            lines.append(f"- {b.get('title', '')}")
+        for _, b in diff["changed"][:5]:
+            lines.append(f"~ {b.get('title', '')}")
+        messagebox.showinfo(f"Changes since '{name}'", "\n".join(lines))
@@ -0,0 +1,387 @@
+"""
+Versioned book collection for the library application.
+Every change produces a new version that shares unchanged structure with the
+previous one, so undo/redo history and named snapshots stay cheap even for
+large catalogs.
+"""
+
+import heapq
+import itertools
+import random
+
+from .data import book_key
+
+
+MAX_HISTORY = 100
+
+
+class _Node:
+    """Treap node. Never modified once it is part of a published version."""
+
+    __slots__ = ("value", "priority", "left", "right", "size")
+
+    def __init__(self, value, priority, left, right):
+        self.value = value
+        self.priority = priority
+        self.left = left
+        self.right = right
+        self.size = _size(left) + _size(right) + 1
+
+
+def _size(node):
+    return node.size if node is not None else 0
+
+
+def _split(node, k):
+    """Split into (first k items, remaining items), copying only the path."""
+    if node is None:
+        return None, None
+    left_size = _size(node.left)
+    if k <= left_size:
+        left, right = _split(node.left, k)
+        return left, _Node(node.value, node.priority, right, node.right)
+    left, right = _split(node.right, k - left_size - 1)
+    return _Node(node.value, node.priority, node.left, left), right
+
+
+def _merge(a, b):
+    """Concatenate two trees, copying only the path along the seam."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a.priority > b.priority:
+        return _Node(a.value, a.priority, a.left, _merge(a.right, b))
+    return _Node(b.value, b.priority, _merge(a, b.left), b.right)
+
+
+def _replace(node, index, value):
+    """Return a tree with the item at index replaced, copying only the path."""
+    left_size = _size(node.left)
+    if index < left_size:
+        return _Node(node.value, node.priority, _replace(node.left, index, value), node.right)
+    if index > left_size:
+        return _Node(node.value, node.priority, node.left,
+                     _replace(node.right, index - left_size - 1, value))
+    return _Node(value, node.priority, node.left, node.right)
+
+
+def _build(values):
+    """Build a balanced tree from a list in O(n)."""
+    def build(lo, hi):
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        return _Node(values[mid], 0.0, build(lo, mid), build(mid + 1, hi))
+
+    root = build(0, len(values))
+    # Hand out priorities in breadth-first order so parents outrank children
+    priorities = sorted((random.random() for _ in values), reverse=True)
+    level = [root] if root is not None else []
+    i = 0
+    while level:
+        next_level = []
+        for node in level:
+            node.priority = priorities[i]
+            i += 1
+            if node.left is not None:
+                next_level.append(node.left)
+            if node.right is not None:
+                next_level.append(node.right)
+        level = next_level
+    return root
+
+
+def _changed_items(old_root, new_root):
+    """
+    Find the items that differ between two trees built from one another.
+
+    Both trees are walked together, largest subtree first. A node object
+    reached from both sides is a shared subtree and is skipped without being
+    visited, so the cost depends on how much changed, not on the tree size.
+
+    Returns:
+        Two lists of (index, value) pairs: items only in the old tree and
+        items only in the new tree
+    """
+    heap = []
+    pending = ({}, {})
+    order = itertools.count()
+
+    def push(side, node, offset):
+        if node is None:
+            return
+        other = pending[1 - side]
+        if id(node) in other:
+            # Every ancestor is larger and already expanded, so a shared
+            # node meets its twin here before either side descends into it
+            del other[id(node)]
+            return
+        pending[side][id(node)] = node
+        heapq.heappush(heap, (-node.size, next(order), side, node, offset))
+
+    push(0, old_root, 0)
+    push(1, new_root, 0)
+    only = ([], [])
+    while heap:
+        _, _, side, node, offset = heapq.heappop(heap)
+        if pending[side].pop(id(node), None) is None:
+            continue
+        index = offset + _size(node.left)
+        only[side].append((index, node.value))
+        push(side, node.left, offset)
+        push(side, node.right, index + 1)
+    return only
+
+
+class PersistentList:
+    """
+    Immutable sequence backed by a persistent treap.
+
+    Updates return a new list in O(log n) and share all untouched nodes with
+    the original, which remains valid and unchanged.
+    """
+
+    __slots__ = ("_root",)
+
+    def __init__(self, values=()):
+        self._root = _build(list(values))
+
+    @classmethod
+    def _from_root(cls, root):
+        plist = cls.__new__(cls)
+        plist._root = root
+        return plist
+
+    def __len__(self):
+        return _size(self._root)
+
+    def __iter__(self):
+        stack = []
+        node = self._root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.value
+            node = node.right
+
+    def _check_index(self, index):
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("PersistentList index out of range")
+        return index
+
+    def __getitem__(self, index):
+        index = self._check_index(index)
+        node = self._root
+        while True:
+            left_size = _size(node.left)
+            if index < left_size:
+                node = node.left
+            elif index > left_size:
+                index -= left_size + 1
+                node = node.right
+            else:
+                return node.value
+
+    def set(self, index, value):
+        """Return a new list with the item at index replaced."""
+        index = self._check_index(index)
+        return self._from_root(_replace(self._root, index, value))
+
+    def insert(self, index, value):
+        """Return a new list with value inserted before index."""
+        index = max(0, min(index, len(self)))
+        left, right = _split(self._root, index)
+        node = _Node(value, random.random(), None, None)
+        return self._from_root(_merge(_merge(left, node), right))
+
+    def append(self, value):
+        """Return a new list with value added at the end."""
+        return self.insert(len(self), value)
+
+    def delete(self, index):
+        """Return a new list with the item at index removed."""
+        index = self._check_index(index)
+        left, rest = _split(self._root, index)
+        _, right = _split(rest, 1)
+        return self._from_root(_merge(left, right))
+
+
+class VersionedCollection:
+    """
+    Book collection with multi-level undo/redo and named snapshots.
+
+    Books are treated as immutable: edits replace a book with an updated copy,
+    so older versions keep seeing the original dictionaries.
+    """
+
+    def __init__(self, books=(), max_history=MAX_HISTORY):
+        self.max_history = max_history
+        self._current = PersistentList(books)
+        self._undo = []
+        self._redo = []
+        self._snapshots = {}
+        self._books_cache = None
+
+    def __len__(self):
+        return len(self._current)
+
+    def __iter__(self):
+        return iter(self._current)
+
+    def books(self):
+        """Return the current version as a plain list (cached per version)."""
+        if self._books_cache is None:
+            self._books_cache = list(self._current)
+        return self._books_cache
+
+    def _set_current(self, version):
+        self._current = version
+        self._books_cache = None
+
+    def _commit(self, version, label):
+        """Make version current and record the previous one for undo."""
+        self._undo.append((label, self._current))
+        if len(self._undo) > self.max_history:
+            del self._undo[0]
+        self._redo.clear()
+        self._set_current(version)
+
+    # Changes
+
+    def add(self, book):
+        """Add a book as a new version."""
+        self._commit(self._current.append(book), f"Add '{book.get('title', '')}'")
+
+    def delete(self, keys):
+        """
+        Delete books whose (title, author, year, genre) key is in keys.
+
+        Returns:
+            Number of books deleted
+        """
+        indexes = [i for i, b in enumerate(self._current) if book_key(b) in keys]
+        version = self._current
+        for i in reversed(indexes):
+            version = version.delete(i)
+        if indexes:
+            self._commit(version, f"Delete {len(indexes)} book(s)")
+        return len(indexes)
+
+    def add_tag(self, keys, tag):
+        """Add a tag to the books matching keys. Returns the number changed."""
+        return self._update_tags(keys, tag, f"Add tag '{tag}'",
+                                 lambda tags: tags + [tag] if tag not in tags else None)
+
+    def remove_tag(self, keys, tag):
+        """Remove a tag from the books matching keys. Returns the number changed."""
+        return self._update_tags(keys, tag, f"Remove tag '{tag}'",
+                                 lambda tags: [t for t in tags if t != tag] if tag in tags else None)
+
+    def _update_tags(self, keys, tag, label, update):
+        version = self._current
+        changed = 0
+        for i, b in enumerate(self._current):
+            if book_key(b) not in keys:
+                continue
+            tags = update(b.get("tags", []))
+            if tags is not None:
+                version = version.set(i, dict(b, tags=tags))
+                changed += 1
+        if changed:
+            self._commit(version, label)
+        return changed
+
+    # History
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo_label(self):
+        """Label of the change undo() would revert, or None."""
+        return self._undo[-1][0] if self._undo else None
+
+    def redo_label(self):
+        """Label of the change redo() would reapply, or None."""
+        return self._redo[-1][0] if self._redo else None
+
+    def undo(self):
+        """Step back one version. Returns the undone label, or None."""
+        if not self._undo:
+            return None
+        label, version = self._undo.pop()
+        self._redo.append((label, self._current))
+        self._set_current(version)
+        return label
+
+    def redo(self):
+        """Reapply the last undone version. Returns its label, or None."""
+        if not self._redo:
+            return None
+        label, version = self._redo.pop()
+        self._undo.append((label, self._current))
+        self._set_current(version)
+        return label
+
+    # Snapshots
+
+    def snapshot(self, name):
+        """Record the current version under name."""
+        self._snapshots[name] = self._current
+
+    def snapshot_names(self):
+        return sorted(self._snapshots)
+
+    def restore(self, name):
+        """Make a snapshot current again. Raises KeyError if it does not exist."""
+        self._commit(self._snapshots[name], f"Restore snapshot '{name}'")
+
+    def diff(self, name, other=None):
+        """
+        Compare a snapshot against the current version or another snapshot.
+
+        Args:
+            name: Snapshot to compare from
+            other: Snapshot to compare to (defaults to the current version)
+
+        Returns:
+            Dict with "added" and "removed" book lists and "changed"
+            (old, new) pairs for books edited in place
+
+        Subtrees shared by both versions are skipped, so the cost grows with
+        the number of changes between them rather than the catalog size.
+        """
+        old = self._snapshots[name]
+        new = self._current if other is None else self._snapshots[other]
+        old_only, new_only = _changed_items(old._root, new._root)
+        # Path copying also revisits unchanged books next to real changes;
+        # those are the same objects on both sides
+        old_ids = {id(b) for _, b in old_only}
+        new_ids = {id(b) for _, b in new_only}
+        removed = [b for _, b in sorted(old_only, key=lambda item: item[0])
+                   if id(b) not in new_ids]
+        added = [b for _, b in sorted(new_only, key=lambda item: item[0])
+                 if id(b) not in old_ids]
+
+        added_by_key = {}
+        for b in added:
+            added_by_key.setdefault(book_key(b), []).append(b)
+        changed = []
+        still_removed = []
+        for b in removed:
+            matches = added_by_key.get(book_key(b))
+            if matches:
+                changed.append((b, matches.pop(0)))
+            else:
+                still_removed.append(b)
+        changed_new = {id(n) for _, n in changed}
+        added = [b for b in added if id(b) not in changed_new]
+        return {"added": added, "removed": still_removed, "changed": changed}
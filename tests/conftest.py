@@ -0,0 +1,28 @@
+"""
+Shared pytest fixtures.
+"""
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_cwd(tmp_path, monkeypatch):
+    """Run each test in an empty directory so library_db.json is never touched."""
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.fixture
+def make_book():
+    """Return a factory for minimal book dictionaries."""
+    def make(title, tags=None):
+        return {"title": title, "author": "Author", "year": "2000",
+                "genre": "Fiction", "tags": list(tags or []), "cover": None}
+    return make
+
+
+@pytest.fixture
+def key():
+    """Return a function giving the book_key() of a make_book() title."""
+    def make_key(title):
+        return (title, "Author", "2000", "Fiction")
+    return make_key
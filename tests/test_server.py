@@ -0,0 +1,209 @@
+"""
+Tests for the local HTTP/JSON service.
+"""
+
+import asyncio
+import json
+import os
+
+import pytest
+
+from Library_app.library_modern import server
+
+
+@pytest.fixture
+def saves(monkeypatch):
+    """Record save_books() calls instead of writing library_db.json."""
+    calls = []
+    monkeypatch.setattr(server, "save_books", lambda books: calls.append(list(books)))
+    return calls
+
+
+async def request(port, method, path, body=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = body if isinstance(body, bytes) else json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\n"
+                 f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), payload
+
+
+def run_with_server(store, scenario):
+    """Run scenario(port) against a live server backed by store."""
+    async def main():
+        await store.start()
+        srv = await asyncio.start_server(server.LibraryServer(store).handle, "127.0.0.1", 0)
+        try:
+            return await scenario(srv.sockets[0].getsockname()[1])
+        finally:
+            srv.close()
+            await srv.wait_closed()
+            await store.stop()
+    return asyncio.run(main())
+
+
+def test_concurrent_writes_are_saved_once_per_batch(saves):
+    store = server.LibraryStore(books=[])
+
+    async def scenario(port):
+        return await asyncio.gather(*[
+            request(port, "POST", "/books", {"title": f"B{i}", "author": "A", "year": "1999"})
+            for i in range(10)
+        ])
+
+    results = run_with_server(store, scenario)
+    assert [status for status, _ in results] == [201] * 10
+    assert len(saves) == 1
+    assert len(saves[0]) == 10
+
+
+def test_pagination_and_tag_filter_keep_collection_order(saves, make_book, key):
+    store = server.LibraryStore(books=[make_book("A"), make_book("B", ["x"]), make_book("C", ["x"])])
+    store.apply_add_tag({key("A")}, "x")
+
+    assert [b["title"] for b in store.query(tag="x")] == ["A", "B", "C"]
+
+    async def scenario(port):
+        return await request(port, "GET", "/books?tag=x&offset=1&limit=1")
+
+    status, payload = run_with_server(store, scenario)
+    page = json.loads(payload)
+    assert status == 200
+    assert page["total"] == 3
+    assert [b["title"] for b in page["items"]] == ["B"]
+
+
+@pytest.mark.parametrize("body", [
+    {"title": "T", "author": "A", "year": "1", "tags": 5},
+    {"title": "T", "author": "A", "year": "1", "tags": [{"a": 1}]},
+    {"title": None, "author": "A", "year": "1"},
+    {"title": "T", "author": "A", "year": 1999},
+    {"title": "T", "author": "A", "year": "1", "cover": 3},
+    {"title": "", "author": "A", "year": "1"},
+])
+def test_invalid_book_is_rejected_without_touching_store(saves, body, make_book, key):
+    store = server.LibraryStore(books=[make_book("A")])
+
+    async def scenario(port):
+        bad = await request(port, "POST", "/books", body)
+        delete = await request(port, "POST", "/books/delete", {"keys": [list(key("A"))]})
+        return bad, delete
+
+    (status, _), (delete_status, payload) = run_with_server(store, scenario)
+    assert status == 400
+    assert delete_status == 200
+    assert json.loads(payload) == {"deleted": 1}
+    assert store.books == []
+
+
+@pytest.mark.parametrize("keys", ["abcd", ["abcd"], [[1, 2, 3, 4]], [["a", "b", "c"]]])
+def test_malformed_keys_are_rejected(saves, keys, make_book):
+    store = server.LibraryStore(books=[make_book("A")])
+
+    async def scenario(port):
+        return await request(port, "POST", "/tags/add", {"keys": keys, "tag": "x"})
+
+    status, _ = run_with_server(store, scenario)
+    assert status == 400
+
+
+def test_failed_tag_change_leaves_store_unchanged(make_book, key):
+    original = make_book("A", ["x"])
+    store = server.LibraryStore(books=[original])
+
+    def failing_change(books, book_keys, tag):
+        for b in books:
+            b["tags"].append(tag)
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        store._apply_tag_change(failing_change, {key("A")}, "y")
+
+    assert store.books == [original]
+    assert original["tags"] == ["x"]
+    assert store.get_tags() == ["x"]
+
+
+def test_tag_edits_update_tags_and_indexes(make_book, key):
+    store = server.LibraryStore(books=[make_book("A", ["x"]), make_book("B")])
+
+    assert store.apply_add_tag({key("A"), key("B")}, "y") == (2, True)
+    assert store.apply_remove_tag({key("A")}, "x") == (1, True)
+    assert store.get_tags() == ["y"]
+    assert [b["tags"] for b in store.books] == [["y"], ["y"]]
+
+
+def test_stream_failure_does_not_append_error_body(saves, monkeypatch, make_book):
+    def broken_lines(books):
+        yield "title\r\n"
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(server, "iter_csv_lines", broken_lines)
+    store = server.LibraryStore(books=[make_book("A")])
+
+    async def scenario(port):
+        return await request(port, "GET", "/export.csv")
+
+    status, payload = run_with_server(store, scenario)
+    assert status == 200
+    assert b"error" not in payload
+    assert not payload.endswith(b"0\r\n\r\n")
+
+
+def test_failed_save_rolls_back_the_batch(monkeypatch, make_book):
+    saved = []
+
+    def flaky_save(books):
+        if not saved:
+            saved.append(None)
+            raise OSError("disk full")
+        saved.append(list(books))
+
+    monkeypatch.setattr(server, "save_books", flaky_save)
+    original = make_book("A", ["x"])
+    store = server.LibraryStore(books=[original])
+    body = {"title": "B", "author": "A", "year": "1999", "tags": ["y"]}
+
+    async def scenario(port):
+        failed = await request(port, "POST", "/books", body)
+        assert store.books == [original]
+        assert store.get_tags() == ["x"]
+        retried = await request(port, "POST", "/books", body)
+        return failed, retried
+
+    (failed_status, _), (retried_status, _) = run_with_server(store, scenario)
+    assert failed_status == 500
+    assert retried_status == 201
+    assert [b["title"] for b in saved[1]] == ["A", "B"]
+    assert store.get_tags() == ["x", "y"]
+
+
+def test_save_refused_when_file_changed_elsewhere(make_book, key):
+    server.save_books([make_book("A")])
+    store = server.LibraryStore()
+    stat = os.stat(server.DB_FILE)
+    os.utime(server.DB_FILE, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    async def scenario(port):
+        return await request(port, "POST", "/books/delete", {"keys": [list(key("A"))]})
+
+    status, payload = run_with_server(store, scenario)
+    assert status == 409
+    assert "changed by another program" in json.loads(payload)["error"]
+    assert [b["title"] for b in store.books] == ["A"]
+
+
+@pytest.mark.parametrize("length, status", [(-1, 400), (server.MAX_BODY_SIZE + 1, 413)])
+def test_content_length_is_bounded(saves, length, status):
+    store = server.LibraryStore(books=[])
+
+    async def scenario(port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"POST /books HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+        response = await reader.read()
+        writer.close()
+        return int(response.split()[1])
+
+    assert run_with_server(store, scenario) == status
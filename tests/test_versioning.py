@@ -0,0 +1,131 @@
+"""
+Tests for the versioned book collection.
+"""
+
+import random
+
+import pytest
+
+from Library_app.library_modern.versioning import (
+    PersistentList, VersionedCollection, _changed_items
+)
+
+
+def test_persistent_list_matches_list():
+    rng = random.Random(1)
+    expected = list(range(500))
+    plist = PersistentList(expected)
+    original = plist
+
+    for step in range(3000):
+        n = len(expected)
+        op = rng.random()
+        if op < 0.3 and n:
+            i = rng.randrange(n)
+            expected.pop(i)
+            plist = plist.delete(i)
+        elif op < 0.6:
+            i = rng.randrange(n + 1)
+            expected.insert(i, -step)
+            plist = plist.insert(i, -step)
+        elif n:
+            i = rng.randrange(n)
+            expected[i] = step
+            plist = plist.set(i, step)
+
+    assert list(plist) == expected
+    assert len(plist) == len(expected)
+    assert [plist[i] for i in (0, -1)] == [expected[0], expected[-1]]
+    assert list(original) == list(range(500))
+
+
+def test_persistent_list_index_errors():
+    plist = PersistentList([1, 2])
+    with pytest.raises(IndexError):
+        plist[2]
+    with pytest.raises(IndexError):
+        plist.delete(-3)
+    assert list(PersistentList().append(1)) == [1]
+
+
+def test_undo_redo_steps_through_versions(make_book, key):
+    collection = VersionedCollection([make_book("A"), make_book("B")])
+
+    assert collection.delete({key("A")}) == 1
+    assert collection.add_tag({key("B")}, "x") == 1
+    assert collection.undo_label() == "Add tag 'x'"
+
+    assert collection.undo() == "Add tag 'x'"
+    assert collection.books()[0]["tags"] == []
+    assert collection.undo() == "Delete 1 book(s)"
+    assert [b["title"] for b in collection.books()] == ["A", "B"]
+    assert collection.undo() is None
+    assert not collection.can_undo()
+
+    assert collection.redo() == "Delete 1 book(s)"
+    assert collection.redo_label() == "Add tag 'x'"
+    collection.add(make_book("C"))
+    assert not collection.can_redo()
+    assert [b["title"] for b in collection.books()] == ["B", "C"]
+
+
+def test_tag_edits_do_not_touch_older_versions(make_book, key):
+    book = make_book("A", ["x"])
+    collection = VersionedCollection([book])
+    collection.remove_tag({key("A")}, "x")
+
+    assert book["tags"] == ["x"]
+    assert collection.books()[0]["tags"] == []
+
+
+def test_history_is_limited(make_book):
+    collection = VersionedCollection(max_history=2)
+    for title in "ABC":
+        collection.add(make_book(title))
+
+    assert collection.undo() and collection.undo()
+    assert collection.undo() is None
+    assert [b["title"] for b in collection.books()] == ["A"]
+
+
+def test_snapshot_restore_and_diff(make_book, key):
+    collection = VersionedCollection([make_book(t) for t in "ABCD"])
+    collection.snapshot("before")
+    collection.delete({key("B")})
+    collection.add_tag({key("C")}, "x")
+    collection.add(make_book("E"))
+
+    diff = collection.diff("before")
+    assert [b["title"] for b in diff["removed"]] == ["B"]
+    assert [b["title"] for b in diff["added"]] == ["E"]
+    assert [(old["tags"], new["tags"]) for old, new in diff["changed"]] == [([], ["x"])]
+
+    collection.snapshot("after")
+    assert collection.diff("before", "after") == diff
+
+    collection.restore("before")
+    assert [b["title"] for b in collection.books()] == ["A", "B", "C", "D"]
+    assert collection.undo() == "Restore snapshot 'before'"
+    assert len(collection) == 4
+    with pytest.raises(KeyError):
+        collection.restore("missing")
+
+
+def test_diff_skips_shared_subtrees(make_book, key):
+    rng = random.Random(2)
+    books = [make_book(f"T{i}") for i in range(5000)]
+    collection = VersionedCollection(books)
+    collection.snapshot("start")
+    removed = set()
+    for _ in range(10):
+        title = f"T{rng.randrange(5000)}"
+        removed.add(title)
+        collection.delete({key(title)})
+
+    old_only, new_only = _changed_items(collection._snapshots["start"]._root,
+                                        collection._current._root)
+    assert len(old_only) + len(new_only) < 1000
+
+    diff = collection.diff("start")
+    assert {b["title"] for b in diff["removed"]} == removed
+    assert diff["added"] == [] and diff["changed"] == []